@@ -1,17 +1,160 @@
+import math
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Below this size the overhead of a NumPy round-trip outweighs the C sort.
+SMALL_SORT_THRESHOLD = 32
+
+# Subarrays larger than this are split across the thread pool.
+PARALLEL_THRESHOLD = 100_000
+_CPU_COUNT = os.cpu_count() or 1
+_MAX_PARALLEL_DEPTH = int(math.log2(_CPU_COUNT))
+_executor = ThreadPoolExecutor(max_workers=_CPU_COUNT)
+
+
 def quicksort(arr):
-    if len(arr) <= 1:
+    if len(arr) < SMALL_SORT_THRESHOLD:
+        _insertion_sort(arr)
         return arr
-    pivot = arr[-1]
-    left = [x for x in arr[:-1] if x <= pivot]
-    right = [x for x in arr[:-1] if x > pivot]
-    return quicksort(left) + [pivot] + quicksort(right)
+    dtype = _numpy_dtype(arr)
+    if dtype is not None:
+        try:
+            a = np.array(arr, dtype=dtype)
+        except (ValueError, OverflowError):
+            a = None
+        if a is not None:
+            # np.sort measures well ahead of the Numba kernel on ints too, so
+            # the kernel is only used by callers sorting int64 arrays via sort_int64.
+            a.sort(kind='quicksort')
+            arr[:] = a.tolist()
+            return arr
+    _quick_sort(arr, 0, len(arr) - 1)
+    return arr
+
+
+def _numpy_dtype(arr):
+    # Only a flat list of plain ints (that fit in int64) or plain floats
+    # round-trips through NumPy unchanged; anything else stays in Python.
+    if np is None:
+        return None
+    if all(type(x) is int for x in arr):
+        if -2**63 <= min(arr) and max(arr) < 2**63:
+            return np.int64
+        return None
+    if all(type(x) is float for x in arr):
+        return np.float64
+    return None
+
+
+def _partition_kernel(a, lo, hi):
+    # Three-way (Dutch national flag) partition around a random pivot:
+    # a[lo:lt] < pivot, a[lt:gt + 1] == pivot, a[gt + 1:hi + 1] > pivot.
+    # Grouping the equal keys keeps duplicate-heavy input O(n log n).
+    pivot = a[np.random.randint(lo, hi + 1)]
+    lt = lo
+    i = lo
+    gt = hi
+    while i <= gt:
+        if a[i] < pivot:
+            a[lt], a[i] = a[i], a[lt]
+            lt += 1
+            i += 1
+        elif a[i] > pivot:
+            a[i], a[gt] = a[gt], a[i]
+            gt -= 1
+        else:
+            i += 1
+    return lt, gt
+
+
+def _qs_kernel(a, lo, hi):
+    # Recurse on the smaller partition and loop on the larger one so the
+    # stack depth stays O(log n) even on adversarial input.
+    while lo < hi:
+        lt, gt = _partition_nb(a, lo, hi)
+        if lt - lo < hi - gt:
+            _qs(a, lo, lt - 1)
+            lo = gt + 1
+        else:
+            _qs(a, gt + 1, hi)
+            hi = lt - 1
+
+
+if njit is not None and np is not None:
+    # nogil lets the pool threads in _par_qs run the kernels concurrently.
+    _partition_nb = njit(cache=True, nogil=True)(_partition_kernel)
+    _qs = njit(cache=True, nogil=True)(_qs_kernel)
+else:
+    _partition_nb = _qs = None
+
+
+def sort_int64(a):
+    """Sort a contiguous int64 array in place with the Numba kernel."""
+    if _qs is None:
+        raise RuntimeError('sort_int64 requires numba')
+    _par_qs(a, 0, a.size - 1, 0)
+    return a
+
 
+def _par_qs(a, lo, hi, depth):
+    if hi - lo <= PARALLEL_THRESHOLD or depth >= _MAX_PARALLEL_DEPTH:
+        _qs(a, lo, hi)
+        return
+    # The two partitions are disjoint, so the left half can be sorted on
+    # another thread while this one handles the right half. Depth is capped
+    # at log2(cpu_count), so waiting tasks never exhaust the pool.
+    lt, gt = _partition_nb(a, lo, hi)
+    future = _executor.submit(_par_qs, a, lo, lt - 1, depth + 1)
+    _par_qs(a, gt + 1, hi, depth + 1)
+    future.result()
+
+
+def _insertion_sort(arr):
+    for i in range(1, len(arr)):
+        key = arr[i]
+        j = i - 1
+        while j >= 0 and arr[j] > key:
+            arr[j + 1] = arr[j]
+            j -= 1
+        arr[j + 1] = key
+
+
+def _quick_sort(arr, low, high):
+    if low < high:
+        pi = _partition(arr, low, high)
+        _quick_sort(arr, low, pi - 1)
+        _quick_sort(arr, pi + 1, high)
+
+
+def _partition(arr, low, high):
+    pivot_idx = random.randint(low, high)
+    arr[pivot_idx], arr[high] = arr[high], arr[pivot_idx]
+    pivot = arr[high]
+    i = low - 1
+    for j in range(low, high):
+        if arr[j] <= pivot:
+            i += 1
+            arr[i], arr[j] = arr[j], arr[i]
+    arr[i + 1], arr[high] = arr[high], arr[i + 1]
+    return i + 1
 
 def test_quicksort():
     # Test case 1: Unsorted array
     arr = [10, 7, 8, 9, 1, 5]
     expected = [1, 5, 7, 8, 9, 10]
     assert quicksort(arr) == expected, 'Test case 1 failed'
+    assert arr == expected, 'Test case 1 failed: not sorted in place'
     
     # Test case 2: Already sorted array
     arr = [1, 2, 3, 4, 5]
@@ -27,7 +170,73 @@ def test_quicksort():
     arr = []
     expected = []
     assert quicksort(arr) == expected, 'Test case 4 failed'
+
+    # Test case 5: Duplicates, sorted in place and returned as the same list
+    arr = [3, 1, 3, 2, 1]
+    expected = [1, 1, 2, 3, 3]
+    assert quicksort(arr) is arr, 'Test case 5 failed: expected the same list back'
+    assert arr == expected, 'Test case 5 failed'
+
+    # Test case 6: Large numeric array (NumPy fast path when available)
+    arr = [random.randint(-1000, 1000) for _ in range(500)]
+    expected = sorted(arr)
+    assert quicksort(arr) == expected, 'Test case 6 failed'
+
+    # Test case 7: Large non-numeric array (pure-Python partition path)
+    arr = [str(random.randint(0, 1000)) for _ in range(100)]
+    expected = sorted(arr)
+    assert quicksort(arr) == expected, 'Test case 7 failed'
     
+    # Test case 8: Tuples must be compared as whole elements
+    arr = [(2, 1), (1, 3)] * 20
+    expected = sorted(arr)
+    assert quicksort(arr) == expected, 'Test case 8 failed'
+
+    # Test case 9: Ragged nested lists
+    arr = [[3], [1, 2]] * 20
+    expected = sorted(arr)
+    assert quicksort(arr) == expected, 'Test case 9 failed'
+
+    # Test case 10: Mixed ints and floats keep their types
+    arr = [random.choice([random.randint(-50, 50), random.uniform(-50, 50)]) for _ in range(100)]
+    expected = sorted(arr)
+    result = quicksort(arr)
+    assert result == expected, 'Test case 10 failed'
+    assert [type(x) for x in result] == [type(x) for x in expected], 'Test case 10 failed: types changed'
+
+    # Test case 11: Ints beyond int64 keep full precision
+    arr = [2**63, -1, 2**63 + 1, 0] * 10
+    expected = sorted(arr)
+    assert quicksort(arr) == expected, 'Test case 11 failed'
+
+    # Test case 12: Many duplicates
+    arr = [random.randint(0, 2) for _ in range(500)]
+    expected = sorted(arr)
+    assert quicksort(arr) == expected, 'Test case 12 failed'
+
+    # Test case 13: Duplicate-heavy input must not go quadratic in the Numba kernel
+    if _qs is not None:
+        a = np.full(300_000, 7, dtype=np.int64)
+        assert (sort_int64(a) == 7).all(), 'Test case 13 failed'
+        a = np.random.randint(0, 3, 300_000).astype(np.int64)
+        expected = np.sort(a)
+        assert (sort_int64(a) == expected).all(), 'Test case 13 failed'
+
+    # Test case 14: Parallel split, forced on with a small threshold and an
+    # 8-worker pool so the submit/result path runs even on a 1-CPU host
+    if _qs is not None:
+        global PARALLEL_THRESHOLD, _MAX_PARALLEL_DEPTH, _executor
+        saved = PARALLEL_THRESHOLD, _MAX_PARALLEL_DEPTH, _executor
+        PARALLEL_THRESHOLD, _MAX_PARALLEL_DEPTH = 1_000, 3
+        _executor = ThreadPoolExecutor(max_workers=8)
+        try:
+            a = np.random.randint(-1000, 1000, 50_000).astype(np.int64)
+            expected = np.sort(a)
+            assert (sort_int64(a) == expected).all(), 'Test case 14 failed'
+        finally:
+            _executor.shutdown()
+            PARALLEL_THRESHOLD, _MAX_PARALLEL_DEPTH, _executor = saved
+
     print('All test cases passed!')
 
 # Run the test
@@ -3,16 +3,43 @@
 import os
 import sys
 import json
+import re
+import stat
+import tempfile
+import difflib
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from textwrap import dedent
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, Set, Tuple
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.style import Style
+from rich.syntax import Syntax
+
+try:
+    # orjson is optional; its JSONDecodeError subclasses json.JSONDecodeError
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+try:
+    # ijson is optional; without it the response is parsed once the stream ends
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    # pyahocorasick is optional; without it edits are applied one str.replace at a time
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # Initialize Rich console
 console = Console()
@@ -21,10 +48,25 @@ console = Console()
 # 1. Configure OpenAI client and load environment variables
 # --------------------------------------------------------------------------------
 load_dotenv()  # Load environment variables from .env file
-client = OpenAI(
-    api_key=os.getenv("DEEPSEEK_API_KEY"), #sk-36f1e4fd00844220a6cebde72bb87afd
-    base_url="https://api.deepseek.com"
-)  # Configure for DeepSeek API
+
+@lru_cache(maxsize=None)
+def _get_client():
+    """Build the DeepSeek client on first use so startup and /add don't pay for importing openai."""
+    import httpx
+    from openai import OpenAI, DefaultHttpxClient
+
+    # Keep connections alive across turns so each request skips the TCP/TLS handshake
+    limits = httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60)
+    try:
+        http_client = DefaultHttpxClient(http2=True, limits=limits)
+    except ImportError:  # HTTP/2 needs the optional 'h2' package (pip install httpx[http2])
+        http_client = DefaultHttpxClient(limits=limits)
+
+    return OpenAI(
+        api_key=os.getenv("DEEPSEEK_API_KEY"), #sk-36f1e4fd00844220a6cebde72bb87afd
+        base_url="https://api.deepseek.com",
+        http_client=http_client
+    )  # Configure for DeepSeek API
 
 # --------------------------------------------------------------------------------
 # 2. Define our schema using Pydantic for type safety
@@ -45,6 +87,22 @@ class AssistantResponse(BaseModel):
     # NEW: optionally hold diff edits
     files_to_edit: Optional[List[FileToEdit]] = None
 
+def _construct_models(model: type, items: Optional[List[Any]]) -> List[Any]:
+    """
+    Build 'model' instances without validation, skipping (with a warning) entries whose
+    required fields are missing or not strings (every required field on our models is a str).
+    """
+    required = [name for name, field in model.model_fields.items() if field.is_required()]
+    models = []
+    for item in items or []:
+        if isinstance(item, dict) and all(isinstance(item.get(name), str) for name in required):
+            models.append(model.model_construct(**item))
+            continue
+        path = item.get("path") if isinstance(item, dict) else None
+        where = f" for '{path}'" if isinstance(path, str) else ""
+        console.print(f"[yellow]⚠[/yellow] Skipping malformed {model.__name__} entry{where}", style="yellow")
+    return models
+
 # --------------------------------------------------------------------------------
 # 3. system prompt
 # --------------------------------------------------------------------------------
@@ -113,17 +171,68 @@ system_PROMPT = dedent("""\
 # 4. Helper functions 
 # --------------------------------------------------------------------------------
 
+# Cache of file contents keyed by absolute path, validated against (mtime_ns, size)
+_FILE_CACHE: Dict[str, Tuple[int, int, str]] = {}
+
 def read_local_file(file_path: str) -> str:
-    """Return the text content of a local file."""
-    with open(file_path, "r", encoding="utf-8") as f:
-        return f.read()
+    """Return the text content of a local file, reusing the cached copy if it is unchanged on disk."""
+    abs_path = os.path.abspath(file_path)
+    st = os.stat(abs_path)
+    cached = _FILE_CACHE.get(abs_path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    with open(abs_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    _FILE_CACHE[abs_path] = (st.st_mtime_ns, st.st_size, content)
+    return content
+
+# Process umask, read once at import so create_file can give new files the default mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Parent directories already created by create_file during this session
+_mkdir_cache: Set[str] = set()
 
 def create_file(path: str, content: str):
     """Create (or overwrite) a file at 'path' with the given 'content'."""
     file_path = Path(path)
-    file_path.parent.mkdir(parents=True, exist_ok=True)  # ensures any dirs exist
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    parent = str(file_path.parent)
+    if parent not in _mkdir_cache:
+        file_path.parent.mkdir(parents=True, exist_ok=True)  # ensures any dirs exist
+        _mkdir_cache.add(parent)
+    # Write to a unique temp file beside the real target (following symlinks) and rename
+    # it over the target, so a crash never leaves a truncated file behind
+    target = os.path.realpath(file_path)
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)  # keep the overwritten file's permissions
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK  # what open(path, "w") would have created
+    tmp_kwargs = dict(dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+    try:
+        fd, tmp_path = tempfile.mkstemp(**tmp_kwargs)
+    except FileNotFoundError:
+        # The cached parent directory was removed during the session; recreate it once
+        _mkdir_cache.discard(parent)
+        Path(tmp_kwargs["dir"]).mkdir(parents=True, exist_ok=True)
+        _mkdir_cache.add(parent)
+        fd, tmp_path = tempfile.mkstemp(**tmp_kwargs)
+    try:
+        try:
+            # Encode once and write straight to the fd, bypassing the buffered text layer
+            data = memoryview(content.encode("utf-8"))
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, target)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+    # Refresh the cache so the next read doesn't go back to disk
+    abs_path = os.path.abspath(file_path)
+    st = os.stat(abs_path)
+    _FILE_CACHE[abs_path] = (st.st_mtime_ns, st.st_size, content)
     console.print(f"[green]✓[/green] Created/updated file at '[cyan]{file_path}[/cyan]'")
     
     # Record the action
@@ -138,6 +247,12 @@ def create_file(path: str, content: str):
         "role": "system",
         "content": f"Content of file '{normalized_path}':\n\n{content}"
     })
+    _files_in_context.add(normalized_path)
+
+# Edits whose snippets together exceed this many characters are shown as a unified diff
+DIFF_TABLE_MAX_CHARS = 2048
+# Maximum number of diff lines shown per large edit
+DIFF_PREVIEW_MAX_LINES = 200
 
 # NEW: Show the user a table of proposed edits and confirm
 def show_diff_table(files_to_edit: List[FileToEdit]) -> None:
@@ -150,33 +265,126 @@ def show_diff_table(files_to_edit: List[FileToEdit]) -> None:
     table.add_column("Original", style="red")
     table.add_column("New", style="green")
 
+    large_edits = []
     for edit in files_to_edit:
-        table.add_row(edit.path, edit.original_snippet, edit.new_snippet)
+        # Huge snippets are slow to lay out in table cells; show them as a unified diff instead
+        if len(edit.original_snippet) + len(edit.new_snippet) > DIFF_TABLE_MAX_CHARS:
+            large_edits.append(edit)
+        else:
+            table.add_row(edit.path, edit.original_snippet, edit.new_snippet)
     
-    console.print(table)
+    if table.row_count:
+        console.print(table)
+
+    for edit in large_edits:
+        diff_lines = list(difflib.unified_diff(
+            edit.original_snippet.splitlines(True), edit.new_snippet.splitlines(True),
+            fromfile="original", tofile="new", n=2
+        ))
+        if len(diff_lines) > DIFF_PREVIEW_MAX_LINES:
+            hidden = len(diff_lines) - DIFF_PREVIEW_MAX_LINES
+            diff_lines = diff_lines[:DIFF_PREVIEW_MAX_LINES] + [f"... ({hidden} more lines)\n"]
+        diff = "".join(line if line.endswith("\n") else line + "\n" for line in diff_lines)
+        console.print(Panel(Syntax(diff, "diff", theme="ansi_dark"), title=edit.path, border_style="magenta"))
+
+def _can_apply_single_pass(edits: List[FileToEdit]) -> bool:
+    """Multi-pattern matching only pays off for several distinct, non-empty snippets."""
+    snippets = [edit.original_snippet for edit in edits]
+    return (
+        ahocorasick is not None
+        and len(snippets) > 1
+        and all(snippets)
+        and len(set(snippets)) == len(snippets)
+    )
+
+def _apply_edits_single_pass(content: str, edits: List[FileToEdit]) -> Optional[str]:
+    """
+    Locate every edit's first occurrence with one Aho-Corasick scan and splice all
+    replacements in a single join. Returns None whenever the result could differ from
+    applying the edits in order (a snippet is missing, matches overlap, or a splice could
+    create a new match for a later edit), so the caller can fall back to the serial path.
+    """
+    automaton = ahocorasick.Automaton()
+    for i, edit in enumerate(edits):
+        automaton.add_word(edit.original_snippet, i)
+    automaton.make_automaton()
+
+    starts: Dict[int, int] = {}
+    for end, i in automaton.iter(content):
+        if i not in starts:
+            starts[i] = end - len(edits[i].original_snippet) + 1
+            if len(starts) == len(edits):
+                break
+    if len(starts) < len(edits):
+        return None
+    ends = {i: starts[i] + len(edits[i].original_snippet) for i in starts}
+
+    # In order, edit i sees the text left by edits before it. A match for i that did not
+    # exist in the original must touch an earlier splice j, so it lies within
+    # len(snippet_i) - 1 characters of it. As long as no other splice falls in that
+    # window, the window's text is just original content around new_j and can be checked.
+    for j in range(len(edits)):
+        for i in range(j + 1, len(edits)):
+            reach = len(edits[i].original_snippet) - 1
+            lo, hi = starts[j] - reach, ends[j] + reach
+            if any(k != j and starts[k] < hi and ends[k] > lo for k in starts):
+                return None
+            window = content[max(lo, 0):starts[j]] + edits[j].new_snippet + content[ends[j]:hi]
+            if edits[i].original_snippet in window:
+                return None
+
+    segments = []
+    pos = 0
+    for i in sorted(starts, key=starts.get):
+        start = starts[i]
+        if start < pos:
+            return None
+        segments.append(content[pos:start])
+        segments.append(edits[i].new_snippet)
+        pos = ends[i]
+    segments.append(content[pos:])
+    return "".join(segments)
 
 # NEW: Apply diff edits
-def apply_diff_edit(path: str, original_snippet: str, new_snippet: str):
-    """Reads the file at 'path', replaces the first occurrence of 'original_snippet' with 'new_snippet', then overwrites."""
+def apply_diff_edits(path: str, edits: List[FileToEdit]):
+    """
+    Reads the file at 'path' once, replaces the first occurrence of each edit's
+    'original_snippet' with its 'new_snippet' in order, then overwrites the file once.
+    """
     try:
         content = read_local_file(path)
-        if original_snippet in content:
-            updated_content = content.replace(original_snippet, new_snippet, 1)
-            create_file(path, updated_content)  # This will now also update conversation context
-            console.print(f"[green]✓[/green] Applied diff edit to '[cyan]{path}[/cyan]'")
-            conversation_history.append({
-                "role": "assistant",
-                "content": f"✓ Applied diff edit to '{path}'"
-            })
+    except FileNotFoundError:
+        console.print(f"[red]✗[/red] File not found for diff editing: '[cyan]{path}[/cyan]'", style="red")
+        return
+
+    applied = 0
+    single_pass = _apply_edits_single_pass(content, edits) if _can_apply_single_pass(edits) else None
+    if single_pass is not None:
+        content = single_pass
+        applied = len(edits)
+        edits = []
+
+    for edit in edits:
+        # One find() both checks for the snippet and locates it for the splice
+        idx = content.find(edit.original_snippet)
+        if idx != -1:
+            content = f"{content[:idx]}{edit.new_snippet}{content[idx + len(edit.original_snippet):]}"
+            applied += 1
         else:
             # NEW: Add debug info about the mismatch
-            console.print(f"[yellow]⚠[/yellow] Original snippet not found in '[cyan]{path}[/cyan]'. No changes made.", style="yellow")
+            console.print(f"[yellow]⚠[/yellow] Original snippet not found in '[cyan]{path}[/cyan]'. Skipping this edit.", style="yellow")
             console.print("\nExpected snippet:", style="yellow")
-            console.print(Panel(original_snippet, title="Expected", border_style="yellow"))
+            console.print(Panel(edit.original_snippet, title="Expected", border_style="yellow"))
             console.print("\nActual file content:", style="yellow")
             console.print(Panel(content, title="Actual", border_style="yellow"))
-    except FileNotFoundError:
-        console.print(f"[red]✗[/red] File not found for diff editing: '[cyan]{path}[/cyan]'", style="red")
+
+    if applied:
+        create_file(path, content)  # This will now also update conversation context
+        console.print(f"[green]✓[/green] Applied {applied} diff edit(s) to '[cyan]{path}[/cyan]'")
+        conversation_history.append({
+            "role": "assistant",
+            "content": f"✓ Applied {applied} diff edit(s) to '{path}'"
+        })
 
 def try_handle_add_command(user_input: str) -> bool:
     """
@@ -188,10 +396,12 @@ def try_handle_add_command(user_input: str) -> bool:
         file_path = user_input[len(prefix):].strip()
         try:
             content = read_local_file(file_path)
+            normalized_path = normalize_path(file_path)
             conversation_history.append({
                 "role": "system",
-                "content": f"Content of file '{file_path}':\n\n{content}"
+                "content": f"Content of file '{normalized_path}':\n\n{content}"
             })
+            _files_in_context.add(normalized_path)
             console.print(f"[green]✓[/green] Added file '[cyan]{file_path}[/cyan]' to conversation.\n")
         except OSError as e:
             console.print(f"[red]✗[/red] Could not add file '[cyan]{file_path}[/cyan]': {e}\n", style="red")
@@ -206,19 +416,20 @@ def ensure_file_in_context(file_path: str) -> bool:
     try:
         normalized_path = normalize_path(file_path)
         content = read_local_file(normalized_path)
-        file_marker = f"Content of file '{normalized_path}'"
-        if not any(file_marker in msg["content"] for msg in conversation_history):
+        if normalized_path not in _files_in_context:
             conversation_history.append({
                 "role": "system",
-                "content": f"{file_marker}:\n\n{content}"
+                "content": f"Content of file '{normalized_path}':\n\n{content}"
             })
+            _files_in_context.add(normalized_path)
         return True
     except OSError:
         console.print(f"[red]✗[/red] Could not read file '[cyan]{file_path}[/cyan]' for editing context", style="red")
         return False
 
+@lru_cache(maxsize=1024)
 def normalize_path(path_str: str) -> str:
-    """Return a canonical, absolute version of the path."""
+    """Return a canonical, absolute version of the path (memoized; the working directory never changes)."""
     return str(Path(path_str).resolve())
 
 # --------------------------------------------------------------------------------
@@ -228,27 +439,126 @@ conversation_history = [
     {"role": "system", "content": system_PROMPT}
 ]
 
+# Normalized paths whose content has been injected into conversation_history
+_files_in_context: Set[str] = set()
+
+# Number of most recent user turns whose messages are kept in conversation_history
+MAX_TURNS = 20
+
+FILE_MARKER_PREFIX = "Content of file '"
+
+def prune_conversation_history() -> None:
+    """
+    Drop stale messages from conversation_history in place. Keeps the system prompt,
+    the newest "Content of file" message per path, and every other message from the
+    last MAX_TURNS user turns.
+    """
+    user_indices = [i for i, msg in enumerate(conversation_history) if msg["role"] == "user"]
+    cutoff = user_indices[-MAX_TURNS] if len(user_indices) > MAX_TURNS else 0
+
+    kept = []
+    seen_files = set()
+    # Walk newest to oldest so the first file message seen for a path is the latest
+    for i in range(len(conversation_history) - 1, 0, -1):
+        msg = conversation_history[i]
+        if msg["role"] == "system" and msg["content"].startswith(FILE_MARKER_PREFIX):
+            path = msg["content"][len(FILE_MARKER_PREFIX):].split("':\n\n", 1)[0]
+            if path in seen_files:
+                continue
+            seen_files.add(path)
+            kept.append(msg)
+        elif i >= cutoff:
+            kept.append(msg)
+    kept.append(conversation_history[0])
+    kept.reverse()
+    conversation_history[:] = kept
+
 # --------------------------------------------------------------------------------
 # 6. OpenAI API interaction with streaming
 # --------------------------------------------------------------------------------
 
+# Whitespace/quote/comma-delimited tokens; a token is a candidate path if it
+# contains a recognized extension or a '/'. Kept as two patterns so neither backtracks.
+_TOKEN_RE = re.compile(r"[^\s'\",]+")
+_PATH_HINT_RE = re.compile(r"\.(?:css|html|js|py|json|md)|/")
+
+def _safe_read(path: str) -> Optional[str]:
+    """Like read_local_file, but returns None instead of raising OSError."""
+    try:
+        return read_local_file(path)
+    except OSError:
+        return None
+
 def guess_files_in_message(user_message: str) -> List[str]:
     """
     Attempt to guess which files the user might be referencing.
     Returns normalized absolute paths.
     """
-    recognized_extensions = [".css", ".html", ".js", ".py", ".json", ".md"]
     potential_paths = []
-    for word in user_message.split():
-        if any(ext in word for ext in recognized_extensions) or "/" in word:
-            path = word.strip("',\"")
-            try:
-                normalized_path = normalize_path(path)
-                potential_paths.append(normalized_path)
-            except (OSError, ValueError):
-                continue
+    for path in _TOKEN_RE.findall(user_message):
+        if not _PATH_HINT_RE.search(path):
+            continue
+        try:
+            normalized_path = normalize_path(path)
+            potential_paths.append(normalized_path)
+        except (OSError, ValueError):
+            continue
     return potential_paths
 
+# Number of streamed chunks written to stdout between flushes
+STREAM_FLUSH_EVERY = 16
+
+class IncrementalJSONParser:
+    """
+    Parses a JSON document on a background thread while its chunks are still
+    arriving, so parsing overlaps with the network stream.
+    """
+
+    def __init__(self):
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._pending = b""
+        self._eof = False
+        self._result: Optional[Any] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk: str) -> None:
+        self._chunks.put(chunk.encode("utf-8"))
+
+    def close(self) -> Optional[Any]:
+        """Signal end of stream; return the parsed document, or None if parsing failed."""
+        self._chunks.put(None)
+        self._thread.join()
+        return self._result
+
+    def read(self, size: int = -1) -> bytes:
+        # File-like interface consumed by ijson; b"" signals end of input
+        while not self._pending and not self._eof:
+            # Block for one chunk, then take everything else already queued so
+            # ijson parses in large blocks rather than one token at a time
+            chunks = [self._chunks.get()]
+            while True:
+                try:
+                    chunks.append(self._chunks.get_nowait())
+                except queue.Empty:
+                    break
+            if None in chunks:
+                self._eof = True
+                chunks = chunks[:chunks.index(None)]
+            self._pending = b"".join(chunks)
+        if size < 0:
+            size = len(self._pending)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def _run(self) -> None:
+        try:
+            # Drain the whole stream so trailing garbage fails here just as it would in json_loads
+            values = list(ijson.items(self, "", use_float=True))
+            self._result = values[0] if len(values) == 1 else None
+        except Exception:
+            self._result = None
+
 def stream_openai_response(user_message: str):
     """
     Streams the DeepSeek chat completion response and handles structured output.
@@ -259,28 +569,30 @@ def stream_openai_response(user_message: str):
     
     valid_files = {}
 
-    # Try to read all potential files before the API call
-    for path in potential_paths:
-        try:
-            content = read_local_file(path)
-            valid_files[path] = content  # path is already normalized
-            file_marker = f"Content of file '{path}'"
-            # Add to conversation if we haven't already
-            if not any(file_marker in msg["content"] for msg in conversation_history):
-                conversation_history.append({
-                    "role": "system",
-                    "content": f"{file_marker}:\n\n{content}"
-                })
-        except OSError:
+    # Read all potential files concurrently before the API call
+    with ThreadPoolExecutor(max_workers=min(8, len(potential_paths) or 1)) as executor:
+        results = dict(zip(potential_paths, executor.map(_safe_read, potential_paths)))
+
+    for path, content in results.items():
+        if content is None:
             error_msg = f"Cannot proceed: File '{path}' does not exist or is not accessible"
             console.print(f"[red]✗[/red] {error_msg}", style="red")
             continue
+        valid_files[path] = content  # path is already normalized
+        # Add to conversation if we haven't already
+        if path not in _files_in_context:
+            conversation_history.append({
+                "role": "system",
+                "content": f"Content of file '{path}':\n\n{content}"
+            })
+            _files_in_context.add(path)
 
     # Now proceed with the API call
     conversation_history.append({"role": "user", "content": user_message})
 
+    parser = None
     try:
-        stream = client.chat.completions.create(
+        stream = _get_client().chat.completions.create(
             model="deepseek-chat",
             messages=conversation_history,
             response_format={"type": "json_object"},
@@ -289,18 +601,32 @@ def stream_openai_response(user_message: str):
         )
 
         console.print("\nAssistant> ", style="bold blue", end="")
-        full_content = ""
+        parts: List[str] = []
+        unflushed = 0
+        if ijson is not None:
+            parser = IncrementalJSONParser()
 
+        # Tokens are raw text, so bypass Rich's markup parsing and flush in batches
         for chunk in stream:
             if chunk.choices[0].delta.content:
                 content_chunk = chunk.choices[0].delta.content
-                full_content += content_chunk
-                console.print(content_chunk, end="")
-
+                parts.append(content_chunk)
+                if parser is not None:
+                    parser.feed(content_chunk)
+                sys.stdout.write(content_chunk)
+                unflushed += 1
+                if unflushed >= STREAM_FLUSH_EVERY or "\n" in content_chunk:
+                    sys.stdout.flush()
+                    unflushed = 0
+
+        sys.stdout.flush()
         console.print()
+        full_content = "".join(parts)
 
         try:
-            parsed_response = json.loads(full_content)
+            parsed_response = parser.close() if parser is not None else None
+            if not isinstance(parsed_response, dict):
+                parsed_response = json_loads(full_content)
             
             # [NEW] Ensure assistant_reply is present
             if "assistant_reply" not in parsed_response:
@@ -321,7 +647,12 @@ def stream_openai_response(user_message: str):
                         continue
                 parsed_response["files_to_edit"] = new_files_to_edit
 
-            response_obj = AssistantResponse(**parsed_response)
+            # The JSON comes from response_format=json_object, so skip full Pydantic validation
+            response_obj = AssistantResponse.model_construct(
+                assistant_reply=str(parsed_response["assistant_reply"]),
+                files_to_create=_construct_models(FileToCreate, parsed_response.get("files_to_create")),
+                files_to_edit=_construct_models(FileToEdit, parsed_response.get("files_to_edit"))
+            )
 
             # Save the assistant's textual reply to conversation
             conversation_history.append({
@@ -340,6 +671,8 @@ def stream_openai_response(user_message: str):
             )
 
     except Exception as e:
+        if parser is not None:
+            parser.close()  # release the parser thread if the stream broke off
         error_msg = f"DeepSeek API error: {str(e)}"
         console.print(f"\n[red]✗[/red] {error_msg}", style="red")
         return AssistantResponse(
@@ -394,11 +727,17 @@ def main():
                 "\nDo you want to apply these changes? ([green]y[/green]/[red]n[/red]): "
             ).strip().lower()
             if confirm == 'y':
+                # Group edits per file so each file is read and written only once
+                edits_by_path = defaultdict(list)
                 for edit_info in response_data.files_to_edit:
-                    apply_diff_edit(edit_info.path, edit_info.original_snippet, edit_info.new_snippet)
+                    edits_by_path[normalize_path(edit_info.path)].append(edit_info)
+                for path, edits in edits_by_path.items():
+                    apply_diff_edits(path, edits)
             else:
                 console.print("[yellow]ℹ[/yellow] Skipped applying diff edits.", style="yellow")
 
+        prune_conversation_history()
+
     console.print("[blue]Session finished.[/blue]")
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+import os
+import shutil
+import stat
+import tempfile
+
+import main
+from main import FileToCreate, FileToEdit
+
+
+def _apply_with_and_without_single_pass(content, edits):
+    results = []
+    saved = main.ahocorasick
+    try:
+        for automaton_module in (saved, None):
+            main.ahocorasick = automaton_module
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "target.txt")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content)
+                main.apply_diff_edits(path, edits)
+                with open(path, "r", encoding="utf-8") as f:
+                    results.append(f.read())
+    finally:
+        main.ahocorasick = saved
+    return results
+
+
+def test_apply_diff_edits_single_pass_matches_serial():
+    # Test case 1: Independent edits
+    content = "def a():\n    return 1\n\ndef b():\n    return 2\n"
+    edits = [
+        FileToEdit(path="target.txt", original_snippet="return 2", new_snippet="return 20"),
+        FileToEdit(path="target.txt", original_snippet="def a():", new_snippet="def aa():"),
+    ]
+    single_pass, serial = _apply_with_and_without_single_pass(content, edits)
+    assert serial == "def aa():\n    return 1\n\ndef b():\n    return 20\n", 'Test case 1 failed'
+    assert single_pass == serial, 'Test case 1 failed: paths disagree'
+
+    # Test case 2: A later edit targets text inserted by an earlier one
+    edits = [
+        FileToEdit(path="target.txt", original_snippet="x", new_snippet="y"),
+        FileToEdit(path="target.txt", original_snippet="y", new_snippet="z"),
+    ]
+    single_pass, serial = _apply_with_and_without_single_pass("x\ny\n", edits)
+    assert serial == "z\ny\n", 'Test case 2 failed'
+    assert single_pass == serial, 'Test case 2 failed: paths disagree'
+
+    # Test case 3: A later snippet spans the end of an earlier splice
+    edits = [
+        FileToEdit(path="target.txt", original_snippet="a", new_snippet="x"),
+        FileToEdit(path="target.txt", original_snippet="xb", new_snippet="Y"),
+    ]
+    single_pass, serial = _apply_with_and_without_single_pass("ab xb", edits)
+    assert serial == "Y xb", 'Test case 3 failed'
+    assert single_pass == serial, 'Test case 3 failed: paths disagree'
+
+    # Test case 4: Deleting text joins a later snippet across the splice
+    edits = [
+        FileToEdit(path="target.txt", original_snippet="X", new_snippet=""),
+        FileToEdit(path="target.txt", original_snippet="ab", new_snippet="Q"),
+    ]
+    single_pass, serial = _apply_with_and_without_single_pass("aXb ab", edits)
+    assert serial == "Q ab", 'Test case 4 failed'
+    assert single_pass == serial, 'Test case 4 failed: paths disagree'
+
+
+def test_construct_models_skips_malformed_entries():
+    items = [
+        {"path": "a.txt", "content": None},
+        {"path": "b.txt"},
+        "c.txt",
+        {"path": "d.txt", "content": "ok"},
+    ]
+    with main.console.capture() as capture:
+        models = main._construct_models(FileToCreate, items)
+    assert [(m.path, m.content) for m in models] == [("d.txt", "ok")], 'Malformed entries were not skipped'
+    assert capture.get().count("Skipping malformed FileToCreate entry") == 3, 'Dropped entries were not reported'
+
+
+def test_read_local_file_cache_invalidation():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "cached.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("first")
+        assert main.read_local_file(path) == "first", 'Initial read failed'
+
+        # Rewriting with a different size must invalidate the cached entry
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("second version")
+        assert main.read_local_file(path) == "second version", 'Stale content returned after rewrite'
+
+        # create_file must refresh the cached entry itself
+        main.create_file(path, "third")
+        cached = main._FILE_CACHE[os.path.abspath(path)]
+        st = os.stat(path)
+        assert cached == (st.st_mtime_ns, st.st_size, "third"), 'create_file did not update the cache'
+        assert main.read_local_file(path) == "third", 'Stale content returned after create_file'
+
+
+def test_prune_conversation_history():
+    saved_history = list(main.conversation_history)
+    saved_max_turns = main.MAX_TURNS
+    main.MAX_TURNS = 2
+    try:
+        system_prompt = main.conversation_history[0]
+        main.conversation_history[:] = [system_prompt]
+        for turn in range(4):
+            main.conversation_history.append({"role": "system", "content": f"Content of file '/a.py':\n\nv{turn}"})
+            main.conversation_history.append({"role": "user", "content": f"u{turn}"})
+            main.conversation_history.append({"role": "assistant", "content": f"a{turn}"})
+        main.conversation_history.append({"role": "system", "content": "Content of file '/b.py':\n\nb"})
+        # The only copy of /c.py is older than the cutoff but must survive
+        main.conversation_history.insert(1, {"role": "system", "content": "Content of file '/c.py':\n\nc"})
+
+        main.prune_conversation_history()
+
+        assert main.conversation_history[0] is system_prompt, 'System prompt was not kept first'
+        assert [msg["content"] for msg in main.conversation_history[1:]] == [
+            "Content of file '/c.py':\n\nc",
+            "u2",
+            "a2",
+            "Content of file '/a.py':\n\nv3",
+            "u3",
+            "a3",
+            "Content of file '/b.py':\n\nb",
+        ], 'Unexpected history after pruning'
+    finally:
+        main.MAX_TURNS = saved_max_turns
+        main.conversation_history[:] = saved_history
+
+
+def test_incremental_json_parser():
+    if main.ijson is None:
+        return
+
+    # Test case 1: Document with a non-ASCII character split across many small chunks
+    doc = '{"assistant_reply": "h\u00e9llo", "files_to_create": [{"path": "a.py", "content": "x = 1.5\\n"}]}'
+    parser = main.IncrementalJSONParser()
+    for i in range(0, len(doc), 3):
+        parser.feed(doc[i:i + 3])
+    assert parser.close() == {
+        "assistant_reply": "h\u00e9llo",
+        "files_to_create": [{"path": "a.py", "content": "x = 1.5\n"}],
+    }, 'Test case 1 failed'
+
+    # Test case 2: Trailing garbage is rejected, like json_loads would
+    parser = main.IncrementalJSONParser()
+    parser.feed('{"a": 1}')
+    parser.feed(' trailing')
+    assert parser.close() is None, 'Test case 2 failed'
+
+    # Test case 3: Empty stream
+    parser = main.IncrementalJSONParser()
+    assert parser.close() is None, 'Test case 3 failed'
+
+
+def test_create_file_keeps_existing_mode():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "script.sh")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("old")
+        os.chmod(path, 0o755)
+        main.create_file(path, "new")
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o755, 'File mode was not preserved'
+
+
+def test_create_file_writes_through_symlink():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        real = os.path.join(tmp_dir, "real.txt")
+        link = os.path.join(tmp_dir, "link.txt")
+        with open(real, "w", encoding="utf-8") as f:
+            f.write("old")
+        os.symlink(real, link)
+        main.create_file(link, "via link")
+        assert os.path.islink(link), 'Symlink was replaced by a regular file'
+        with open(real, "r", encoding="utf-8") as f:
+            assert f.read() == "via link", 'Symlink target was not updated'
+
+
+def test_create_file_leaves_tmp_sibling_alone():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "x.txt")
+        sibling = path + ".tmp"
+        with open(sibling, "w", encoding="utf-8") as f:
+            f.write("user file")
+        main.create_file(path, "x")
+        with open(sibling, "r", encoding="utf-8") as f:
+            assert f.read() == "user file", 'Existing .tmp sibling was overwritten'
+        assert sorted(os.listdir(tmp_dir)) == ["x.txt", "x.txt.tmp"], 'Temp file was left behind'
+
+
+def test_create_file_recreates_deleted_parent():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "sub", "f.txt")
+        main.create_file(path, "one")
+        shutil.rmtree(os.path.join(tmp_dir, "sub"))
+        main.create_file(path, "two")
+        with open(path, "r", encoding="utf-8") as f:
+            assert f.read() == "two", 'Deleted parent directory was not recreated'
+
+
+if __name__ == '__main__':
+    test_apply_diff_edits_single_pass_matches_serial()
+    test_construct_models_skips_malformed_entries()
+    test_read_local_file_cache_invalidation()
+    test_prune_conversation_history()
+    test_incremental_json_parser()
+    test_create_file_keeps_existing_mode()
+    test_create_file_writes_through_symlink()
+    test_create_file_leaves_tmp_sibling_alone()
+    test_create_file_recreates_deleted_parent()
+    print('All test cases passed!')